@@ -11,6 +11,12 @@ Fine-tune strategy parameters to maximize performance metrics:
 This optimizer tests different parameter combinations to find the best settings.
 """
 
+import hashlib
+import itertools
+import json
+import os
+import tempfile
+
 import pandas as pd
 import numpy as np
 from data_download_manager import CryptoDataManager
@@ -19,6 +25,151 @@ from typing import Dict, Tuple
 import warnings
 warnings.filterwarnings('ignore')
 
+# joblib is optional like numba: without it the grid search just runs
+# serially in-process.
+try:
+    import joblib
+    from joblib import Parallel, delayed
+except ImportError:
+    joblib = None
+    Parallel = None
+
+# numba is optional: the optimizer runs locally and submissions never import
+# this module, so a missing install just means the kernels run as plain
+# Python on NumPy arrays.
+try:
+    from numba import njit
+    _HAVE_NUMBA = True
+except ImportError:
+    _HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        def wrap(func):
+            return func
+        return wrap
+
+
+@njit(cache=True)
+def _pair_trades(buys, sells):
+    """Pair entry rows with their exit rows for an alternating long-only book.
+
+    buys/sells are sorted row indices of BUY/SELL signals. Walks the same
+    state machine as the old per-row loop — a BUY opens a position only when
+    flat, the first SELL after it closes it — but jumps between trades with
+    np.searchsorted instead of visiting every row. Returns aligned
+    (buy_idx, sell_idx) index arrays; an unmatched trailing BUY is dropped,
+    matching the old loop which never realized an open position.
+    """
+    n_buys, n_sells = len(buys), len(sells)
+    cap = min(n_buys, n_sells)
+    buy_idx = np.empty(cap, dtype=np.int64)
+    sell_idx = np.empty(cap, dtype=np.int64)
+    k = 0
+    b = 0
+    while b < n_buys:
+        s = np.searchsorted(sells, buys[b])
+        if s >= n_sells:
+            break
+        buy_idx[k] = buys[b]
+        sell_idx[k] = sells[s]
+        k += 1
+        b = np.searchsorted(buys, sells[s])
+    return buy_idx[:k], sell_idx[:k]
+
+
+def _evaluate_config(anchor_df, target_df, cfg):
+    """Score one parameter configuration against the downloaded dataset.
+
+    Module-level rather than a method so loky can pickle it for worker
+    processes; each call builds its own optimizer shell (no download —
+    the data arrives as arguments).
+    """
+    optimizer = StrategyOptimizer()
+    signals_df = generate_signals(anchor_df, target_df, params=cfg)
+    optimizer._inject_true_close(signals_df, target_df)
+    metrics = optimizer.calculate_performance_metrics(signals_df, price_col='true_close')
+    return cfg, metrics
+
+
+def _evaluate_config_from_path(data_path, cfg):
+    """Worker entry point for the parallel grid: load the shared dataset.
+
+    mmap_mode='r' memory-maps the numeric blocks of the dumped frames, so
+    every loky worker reads the same OS page-cache pages instead of each
+    receiving a pickled copy of the dataset over the IPC pipe.
+    """
+    anchor_df, target_df = joblib.load(data_path, mmap_mode='r')
+    return _evaluate_config(anchor_df, target_df, cfg)
+
+
+@njit(cache=True)
+def _stats(returns):
+    """Fused metric reductions over the weighted trade returns.
+
+    One sweep carries the running sum/sum-of-squares, compounded
+    portfolio value with its peak and worst drawdown, and the win count,
+    instead of separate mean/std/cumprod/accumulate/min passes over the
+    same array. Returns (portfolio_value, mean, std, max_drawdown, wins)
+    with std population-based and max_drawdown as a negative fraction,
+    matching the previous np.std / peak-relative computations.
+    """
+    n = returns.shape[0]
+    total = 0.0
+    total_sq = 0.0
+    pv = 1.0
+    peak = 1.0
+    mdd = 0.0
+    wins = 0
+    for i in range(n):
+        r = returns[i]
+        total += r
+        total_sq += r * r
+        pv *= 1.0 + r
+        if pv > peak:
+            peak = pv
+        dd = (pv - peak) / peak
+        if dd < mdd:
+            mdd = dd
+        if r > 0:
+            wins += 1
+    mean = total / n
+    var = total_sq / n - mean * mean
+    if var < 0.0:
+        var = 0.0
+    return pv, mean, np.sqrt(var), mdd, wins
+
+
+def _stats_numpy(returns):
+    """Vectorized _stats for when numba is absent.
+
+    The scalar sweep above would run as slow interpreted Python without a
+    JIT, so this fallback stays in ufunc land. Drawdown works in log
+    space: cumsum of log1p returns gives the equity curve, the running
+    peak is one maximum.accumulate, and their difference recovers the
+    peak-relative drawdown through expm1 — a single division-free chain
+    instead of the per-step (pv - peak) / peak arithmetic.
+    """
+    log_cum = np.cumsum(np.log1p(returns))
+    mdd = np.expm1(log_cum - np.maximum.accumulate(log_cum)).min()
+    pv = np.prod(1.0 + returns)
+    return pv, returns.mean(), returns.std(), mdd, int((returns > 0).sum())
+
+
+if not _HAVE_NUMBA:
+    _stats = _stats_numpy
+
+# A pre-built AOT extension (python build_aot.py) takes precedence over
+# the JIT versions: it imports instantly, which matters for short-lived
+# grid-search workers that would otherwise pay compile/cache-load on
+# every process start.
+try:
+    import metrics_aot
+    _pair_trades = metrics_aot.pair_trades
+    _stats = metrics_aot.stats
+except ImportError:
+    pass
+
+
 class StrategyOptimizer:
     """Optimize strategy parameters for maximum performance."""
     
@@ -47,98 +198,197 @@ class StrategyOptimizer:
                 "timeframe": anchor['timeframe']
             })
         
-        # Download data
-        full_df = self.data_manager.get_market_data(all_symbols)
-        
-        # Split into anchor and target dataframes
-        anchor_cols = ['timestamp']
-        target_cols = ['timestamp']
-        
-        for anchor in self.metadata['anchors']:
-            symbol, timeframe = anchor['symbol'], anchor['timeframe']
-            for col_type in ['open', 'high', 'low', 'close', 'volume']:
-                col_name = f"{col_type}_{symbol}_{timeframe}"
-                if col_name in full_df.columns:
-                    anchor_cols.append(col_name)
-        
-        for target in self.metadata['targets']:
-            symbol, timeframe = target['symbol'], target['timeframe']
-            for col_type in ['open', 'high', 'low', 'close', 'volume']:
-                col_name = f"{col_type}_{symbol}_{timeframe}"
-                if col_name in full_df.columns:
-                    target_cols.append(col_name)
+        # Cached download: the dataset is identical for every config of a
+        # grid search (and across re-runs - the round's date range is
+        # fixed), so it is keyed by the symbol/timeframe/date-range request
+        # and stored as Parquet. A missing parquet engine or unreadable
+        # file just falls back to the network fetch.
+        cache_key = hashlib.sha1(json.dumps(
+            {'symbols': all_symbols,
+             'start': self.data_manager.start_date,
+             'end': self.data_manager.end_date},
+            sort_keys=True).encode()).hexdigest()[:12]
+        cache_path = os.path.join('cache', f'market_data_{cache_key}.parquet')
+
+        full_df = None
+        if os.path.exists(cache_path):
+            try:
+                full_df = pd.read_parquet(cache_path)
+                print(f"📦 Loaded cached market data ({cache_path})")
+            except Exception:
+                full_df = None
+
+        if full_df is None:
+            # Download data
+            full_df = self.data_manager.get_market_data(all_symbols)
+            try:
+                os.makedirs('cache', exist_ok=True)
+                full_df.to_parquet(cache_path)
+            except Exception:
+                pass
         
-        anchor_df = full_df[anchor_cols].copy()
-        target_df = full_df[target_cols].copy()
+        # Split into anchor and target dataframes. Plain column projections
+        # are enough here - the consumers only read, so the defensive
+        # .copy() calls (which doubled peak memory) are gone.
+        anchor_suffixes = {f"_{a['symbol']}_{a['timeframe']}" for a in self.metadata['anchors']}
+        target_suffixes = {f"_{t['symbol']}_{t['timeframe']}" for t in self.metadata['targets']}
+
+        anchor_cols = ['timestamp'] + [c for c in full_df.columns
+                                       if any(c.endswith(s) for s in anchor_suffixes)]
+        target_cols = ['timestamp'] + [c for c in full_df.columns
+                                       if any(c.endswith(s) for s in target_suffixes)]
+
+        anchor_df = full_df[anchor_cols]
+        target_df = full_df[target_cols]
         
         print(f"✅ Data downloaded - Anchor: {anchor_df.shape}, Target: {target_df.shape}")
         return anchor_df, target_df
     
-    def calculate_performance_metrics(self, signals_df: pd.DataFrame) -> Dict[str, float]:
-        """Calculate key performance metrics using actual price data."""
+    def _inject_true_close(self, signals_df: pd.DataFrame, target_df: pd.DataFrame) -> pd.DataFrame:
+        """Add a true_close column from the target close prices, in place.
+
+        One long-format price table aligned against the whole
+        (symbol, timestamp) index in a single lookup, instead of a merge
+        (and its hash-index build) plus masked write per target.
+        """
+        price_frames = [
+            target_df[['timestamp', f"close_{t['symbol']}_{t['timeframe']}"]]
+            .rename(columns={f"close_{t['symbol']}_{t['timeframe']}": 'true_close'})
+            .assign(symbol=t['symbol'])
+            for t in self.metadata['targets']
+            if f"close_{t['symbol']}_{t['timeframe']}" in target_df.columns
+        ]
+        if price_frames:
+            prices = (pd.concat(price_frames, ignore_index=True)
+                      .set_index(['symbol', 'timestamp'])['true_close'])
+            signals_df['true_close'] = pd.MultiIndex.from_frame(
+                signals_df[['symbol', 'timestamp']]).map(prices)
+        return signals_df
+
+    def calculate_performance_metrics(self, signals_df: pd.DataFrame,
+                                      price_col: str = 'price') -> Dict[str, float]:
+        """Calculate key performance metrics using actual price data.
+
+        price_col names the preferred price source; resolution falls back
+        through true_close → price → the first close column, so the one
+        method serves both the raw signals frame and the true_close-
+        injected frame that run_optimization builds.
+        """
         metrics = {}
 
-        portfolio_value = 1.0
-        portfolio_history = [portfolio_value]
-        daily_returns = []
-
-        # Use actual price data for each trade
-        for symbol in signals_df['symbol'].unique():
-            symbol_signals = signals_df[signals_df['symbol'] == symbol].copy()
-            symbol_signals = symbol_signals.sort_values('timestamp').reset_index(drop=True)
-
-            position = 0
-            entry_price = 0
-
-            # Use the 'price' column from signals_df if available
-            if 'price' not in symbol_signals.columns:
-                # Try to reconstruct price from close columns
-                price_col = [c for c in symbol_signals.columns if c.startswith('close_') and c.endswith('1H')]
-                if price_col:
-                    symbol_signals['price'] = symbol_signals[price_col[0]]
-                else:
-                    continue  # Skip if no price data
-
-            for i in range(len(symbol_signals)):
-                signal = symbol_signals['signal'].iloc[i]
-                position_size = symbol_signals['position_size'].iloc[i]
-                price = symbol_signals['price'].iloc[i]
-
-                if signal == 'BUY' and position == 0:
-                    position = position_size
-                    entry_price = price
-                elif signal == 'SELL' and position > 0:
-                    if entry_price > 0:
-                        return_pct = (price - entry_price) / entry_price
-                        portfolio_value *= (1 + return_pct * position)
-                        portfolio_history.append(portfolio_value)
-                        daily_returns.append(return_pct * position)
-                    position = 0
-                    entry_price = 0
-
-        # Calculate metrics
+        # Preallocated trade buffers with a fill pointer; the BUY count
+        # bounds the number of realized trades, so there are no list
+        # appends or growth reallocations, and the final arrays are
+        # zero-copy slices.
+        raw_returns = np.empty(0)
+        entry_positions = np.empty(0)
+        n_trades = 0
+
+        # The columns are the same for every symbol, so the price source
+        # resolves once, not per group.
+        name = next((c for c in (price_col, 'true_close', 'price')
+                     if c in signals_df.columns), None)
+        if name is not None:
+            price_values = signals_df[name].to_numpy(dtype=np.float64)
+        else:
+            close_cols = [c for c in signals_df.columns if c.startswith('close_') and c.endswith('1H')]
+            price_values = (signals_df[close_cols[0]].to_numpy(dtype=np.float64)
+                            if close_cols else None)
+
+        if price_values is not None:
+            # One lexsort groups the rows by symbol (in first-appearance
+            # order, so the portfolio sequence matches the old unique()
+            # traversal) with timestamps sorted inside each group. Groups
+            # are then contiguous slices of the sorted arrays — no
+            # per-symbol filter/copy/sort_values round trips.
+            # generate_signals emits symbol as a categorical, whose integer
+            # codes already identify the groups — remapping them to
+            # first-appearance order is pure integer work, versus the
+            # string-hashing pass factorize needs on an object column. The
+            # object-dtype path keeps factorize; both orders match, so the
+            # portfolio sequence is identical either way.
+            sym = signals_df['symbol']
+            raw_codes = (sym.cat.codes.to_numpy()
+                         if isinstance(sym.dtype, pd.CategoricalDtype) else None)
+            if raw_codes is not None and len(raw_codes) and raw_codes.min() >= 0:
+                present, first_pos = np.unique(raw_codes, return_index=True)
+                remap = np.empty(present.max() + 1, dtype=np.int64)
+                remap[present[np.argsort(first_pos)]] = np.arange(len(present))
+                codes = remap[raw_codes]
+                n_groups = len(present)
+            else:
+                codes, uniques = pd.factorize(sym, sort=False)
+                n_groups = len(uniques)
+            order = np.lexsort((signals_df['timestamp'].to_numpy(), codes))
+
+            # Encode signals as int8 codes (BUY=1, SELL=-1, HOLD=0) in one
+            # vectorized pass; the per-group scans below then compare small
+            # ints instead of Python strings, 1 byte per row instead of an
+            # object pointer.
+            sig_values = signals_df['signal'].to_numpy()
+            sig = np.where(sig_values == 'BUY', 1,
+                           np.where(sig_values == 'SELL', -1, 0)).astype(np.int8)[order]
+            pos = signals_df['position_size'].to_numpy(dtype=np.float64)[order]
+            px = price_values[order]
+            sorted_codes = codes[order]
+            bounds = np.searchsorted(sorted_codes, np.arange(n_groups + 1))
+
+            n_buys_total = int((sig == 1).sum())
+            raw_returns = np.empty(n_buys_total)
+            entry_positions = np.empty(n_buys_total)
+
+            for g in range(n_groups):
+                lo, hi = bounds[g], bounds[g + 1]
+                g_sig = sig[lo:hi]
+
+                # Symbols that never entered a position (common under a
+                # strict entry gate) are done after this one scan: no SELL
+                # scan, no pairing, no price slicing.
+                buys = np.flatnonzero(g_sig == 1)
+                if not len(buys):
+                    continue
+
+                # Pair entries with exits via searchsorted — per-trade work
+                # rather than per-row boxed pandas scalars.
+                buy_idx, sell_idx = _pair_trades(buys, np.flatnonzero(g_sig == -1))
+
+                if len(buy_idx):
+                    g_px = px[lo:hi]
+                    entry_px = g_px[buy_idx]
+                    # entry_px > 0 replicates the old entry_price guard:
+                    # trades with a zero/NaN entry still consumed their SELL
+                    # (the pairing ran) but are not realized.
+                    valid = entry_px > 0
+                    group_returns = ((g_px[sell_idx] - entry_px) / entry_px)[valid]
+                    stop = n_trades + len(group_returns)
+                    raw_returns[n_trades:stop] = group_returns
+                    entry_positions[n_trades:stop] = pos[lo:hi][buy_idx][valid]
+                    n_trades = stop
+
+        # Position weighting is one SIMD multiply over the filled trade
+        # buffers rather than being folded into each group expression.
+        daily_returns = np.multiply(raw_returns[:n_trades],
+                                    entry_positions[:n_trades])
+
+        # Calculate metrics: compounding, Sharpe inputs, drawdown and win
+        # count all come from the single fused sweep in _stats.
         if len(daily_returns) > 0:
+            portfolio_value, mean_return, std_return, mdd, wins = _stats(daily_returns)
+
             total_return = (portfolio_value - 1.0) * 100  # Percentage
-            daily_returns = np.array(daily_returns)
-            
+
             # Sharpe Ratio (assuming 252 trading days)
-            if np.std(daily_returns) > 0:
-                sharpe_ratio = np.mean(daily_returns) / np.std(daily_returns) * np.sqrt(252)
+            if std_return > 0:
+                sharpe_ratio = mean_return / std_return * np.sqrt(252)
             else:
                 sharpe_ratio = 0
-            
-            # Max Drawdown
-            portfolio_history = np.array(portfolio_history)
-            peak = np.maximum.accumulate(portfolio_history)
-            drawdown = (portfolio_history - peak) / peak
-            max_drawdown = np.min(drawdown) * 100  # Percentage
-            
+
             metrics = {
                 'total_return': total_return,
                 'sharpe_ratio': sharpe_ratio,
-                'max_drawdown': abs(max_drawdown),
+                'max_drawdown': abs(mdd * 100),
                 'num_trades': len(daily_returns),
-                'win_rate': np.sum(daily_returns > 0) / len(daily_returns) if len(daily_returns) > 0 else 0
+                'win_rate': wins / len(daily_returns)
             }
         else:
             metrics = {
@@ -157,24 +407,77 @@ class StrategyOptimizer:
         
         # Profitability Score (45 points max)
         # Assuming linear scaling: 0% = 0 points, 20% = 45 points
-        profit_score = min(45, max(0, metrics['total_return'] * 2.25))
+        profit_score = float(np.clip(metrics['total_return'] * 2.25, 0, 45))
         scores['profitability'] = profit_score
-        
+
         # Sharpe Ratio Score (35 points max)
         # Assuming: Sharpe 0 = 0 points, Sharpe 2 = 35 points
-        sharpe_score = min(35, max(0, metrics['sharpe_ratio'] * 17.5))
+        sharpe_score = float(np.clip(metrics['sharpe_ratio'] * 17.5, 0, 35))
         scores['sharpe'] = sharpe_score
-        
+
         # Max Drawdown Score (20 points max)
         # Lower drawdown = higher score: 0% = 20 points, 20% = 0 points
-        drawdown_score = max(0, 20 - metrics['max_drawdown'])
+        drawdown_score = float(np.clip(20 - metrics['max_drawdown'], 0, None))
         scores['drawdown'] = drawdown_score
         
         # Total Score
         scores['total'] = profit_score + sharpe_score + drawdown_score
-        
+
         return scores
-    
+
+    def score_performance_batch(self, metrics_df: pd.DataFrame) -> pd.DataFrame:
+        """Vectorized score_performance: one row of scores per metrics row.
+
+        Same Lunor point formulas, but applied with np.clip over whole
+        columns so a grid search scores every configuration in one shot
+        instead of per-dict Python min/max calls.
+        """
+        scores = pd.DataFrame({
+            'profitability': np.clip(metrics_df['total_return'] * 2.25, 0, 45),
+            'sharpe': np.clip(metrics_df['sharpe_ratio'] * 17.5, 0, 35),
+            'drawdown': np.clip(20 - metrics_df['max_drawdown'], 0, None),
+        })
+        scores['total'] = scores['profitability'] + scores['sharpe'] + scores['drawdown']
+        return scores
+
+    def run_grid(self, param_grid: Dict[str, list], n_jobs: int = -1) -> pd.DataFrame:
+        """Evaluate every combination in param_grid and rank by total score.
+
+        param_grid maps strategy parameter names (see strategy.FSM_PARAMS)
+        to lists of candidate values. Configurations are independent, so
+        they fan out over CPU cores with joblib's loky backend when it is
+        available (n_jobs=1 or no joblib runs them serially). The dataset
+        is downloaded once and shipped to the workers; returns a DataFrame
+        with one row per configuration, best total score first.
+        """
+        anchor_df, target_df = self.download_full_dataset()
+
+        keys = list(param_grid)
+        configs = [dict(zip(keys, values))
+                   for values in itertools.product(*param_grid.values())]
+        print(f"🔬 Evaluating {len(configs)} parameter combinations...")
+
+        if Parallel is not None and n_jobs != 1:
+            # Dump the dataset once and hand workers the path: the frames
+            # are memory-mapped on load, shared through the page cache
+            # rather than pickled per task.
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                data_path = os.path.join(tmp_dir, 'dataset.joblib')
+                joblib.dump((anchor_df, target_df), data_path)
+                results = Parallel(n_jobs=n_jobs, backend='loky')(
+                    delayed(_evaluate_config_from_path)(data_path, cfg)
+                    for cfg in configs)
+        else:
+            results = [_evaluate_config(anchor_df, target_df, cfg)
+                       for cfg in configs]
+
+        metrics_df = pd.DataFrame([metrics for _, metrics in results])
+        scores_df = self.score_performance_batch(metrics_df)
+        out = pd.concat([pd.DataFrame([cfg for cfg, _ in results]),
+                         metrics_df, scores_df], axis=1)
+        return (out.sort_values('total', ascending=False)
+                .reset_index(drop=True))
+
     def run_optimization(self):
         """Run the optimization process."""
         print("🎯 Starting Strategy Optimization...")
@@ -189,88 +492,11 @@ class StrategyOptimizer:
             signals_df = generate_signals(anchor_df, target_df)
 
             # --- Inject true close price from target_df for each symbol ---
-            for target in self.metadata['targets']:
-                sym = target['symbol']
-                tf = target['timeframe']
-                price_col = f"close_{sym}_{tf}"
-                price_df = target_df[["timestamp", price_col]].rename(columns={price_col: "true_close"})
-                mask = signals_df["symbol"] == sym
-                if mask.any():
-                    merged = signals_df.loc[mask].merge(
-                        price_df, on="timestamp", how="left"
-                    )
-                    # Only assign if 'true_close' exists in merged columns
-                    if "true_close" in merged.columns:
-                        signals_df.loc[mask, "true_close"] = merged["true_close"].values
-                    else:
-                        signals_df.loc[mask, "true_close"] = np.nan
-
-            # Use true_close for performance metrics if available
-            def patched_performance_metrics(signals_df: pd.DataFrame) -> Dict[str, float]:
-                metrics = {}
-                portfolio_value = 1.0
-                portfolio_history = [portfolio_value]
-                daily_returns = []
-                for symbol in signals_df['symbol'].unique():
-                    symbol_signals = signals_df[signals_df['symbol'] == symbol].copy()
-                    symbol_signals = symbol_signals.sort_values('timestamp').reset_index(drop=True)
-                    position = 0
-                    entry_price = 0
-                    # Use 'true_close' if available, else fallback to 'price'
-                    if 'true_close' in symbol_signals.columns:
-                        symbol_signals['price'] = symbol_signals['true_close']
-                    elif 'price' not in symbol_signals.columns:
-                        price_col = [c for c in symbol_signals.columns if c.startswith('close_') and c.endswith('1H')]
-                        if price_col:
-                            symbol_signals['price'] = symbol_signals[price_col[0]]
-                        else:
-                            continue
-                    for i in range(len(symbol_signals)):
-                        signal = symbol_signals['signal'].iloc[i]
-                        position_size = symbol_signals['position_size'].iloc[i]
-                        price = symbol_signals['price'].iloc[i]
-                        if signal == 'BUY' and position == 0:
-                            position = position_size
-                            entry_price = price
-                        elif signal == 'SELL' and position > 0:
-                            if entry_price > 0:
-                                return_pct = (price - entry_price) / entry_price
-                                portfolio_value *= (1 + return_pct * position)
-                                portfolio_history.append(portfolio_value)
-                                daily_returns.append(return_pct * position)
-                            position = 0
-                            entry_price = 0
-                if len(daily_returns) > 0:
-                    total_return = (portfolio_value - 1.0) * 100
-                    daily_returns = np.array(daily_returns)
-                    if np.std(daily_returns) > 0:
-                        sharpe_ratio = np.mean(daily_returns) / np.std(daily_returns) * np.sqrt(252)
-                    else:
-                        sharpe_ratio = 0
-                    portfolio_history = np.array(portfolio_history)
-                    peak = np.maximum.accumulate(portfolio_history)
-                    drawdown = (portfolio_history - peak) / peak
-                    max_drawdown = np.min(drawdown) * 100
-                    metrics = {
-                        'total_return': total_return,
-                        'sharpe_ratio': sharpe_ratio,
-                        'max_drawdown': abs(max_drawdown),
-                        'num_trades': len(daily_returns),
-                        'win_rate': np.sum(daily_returns > 0) / len(daily_returns) if len(daily_returns) > 0 else 0
-                    }
-                else:
-                    metrics = {
-                        'total_return': 0,
-                        'sharpe_ratio': 0,
-                        'max_drawdown': 0,
-                        'num_trades': 0,
-                        'win_rate': 0
-                    }
-                return metrics
-
-            # Calculate performance using patched function
+            self._inject_true_close(signals_df, target_df)
+
+            # Calculate performance against the injected true_close prices
             print("📊 Calculating performance metrics...")
-            metrics = patched_performance_metrics(signals_df)
+            metrics = self.calculate_performance_metrics(signals_df, price_col='true_close')
             scores = self.score_performance(metrics)
             
             # Display results